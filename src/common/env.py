@@ -1,9 +1,10 @@
 """The full configuration."""
 
 import logging
+from functools import lru_cache
 from typing import Union
 
-from pydantic import field_validator
+from pydantic import StrictStr, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -21,120 +22,14 @@ class Settings(BaseSettings):
             Can be integer or predefined levels in logging (e.g. INFO, DEBUG)
     """
 
-    username: str
-    tmdb_access_token: str
-    tmdb_api_key: str
-    database_url: str
+    username: StrictStr
+    tmdb_access_token: StrictStr
+    tmdb_api_key: StrictStr
+    database_url: StrictStr
     local: bool = True
     default_log_level: int = logging.INFO
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
-    @field_validator("username")
-    @classmethod
-    def validate_username(
-        cls,
-        username: str,
-    ) -> str:
-        """
-        Validate the username.
-
-        Args:
-            username (str): username of the letterboxd account
-        Returns:
-            The validated username.
-        Raises:
-            AttributeError if the username is not a string
-        """
-        if not isinstance(username, str):
-            raise AttributeError(f"username must be of type str not {type(username)}")
-        return username
-
-    @field_validator("tmdb_access_token")
-    @classmethod
-    def validate_tmdb_access_token(
-        cls,
-        tmdb_access_token: str,
-    ) -> str:
-        """
-        Validate the TMDB access token.
-
-        Args:
-            tmdb_access_token (str): the TMDB access token
-        Returns:
-            The validated TMDB access token.
-        Raises:
-            AttributeError if the TMDB access token is not a string
-        """
-        if not isinstance(tmdb_access_token, str):
-            raise AttributeError(
-                f"tmdb_access_token must be of type str not {type(tmdb_access_token)}"
-            )
-        return tmdb_access_token
-
-    @field_validator("tmdb_access_token")
-    @classmethod
-    def validate_tmdb_api_key(
-        cls,
-        tmdb_api_key: str,
-    ) -> str:
-        """
-        Validate the TMDB API key.
-
-        Args:
-            tmdb_api_key (str): the TMDB API key
-        Returns:
-            The validated TMDB API key.
-        Raises:
-            AttributeError if the TMDB API key is not a string
-        """
-        if not isinstance(tmdb_api_key, str):
-            raise AttributeError(
-                f"tmdb_api_key must be of type str not {type(tmdb_api_key)}"
-            )
-        return tmdb_api_key
-
-    @field_validator("database_url")
-    @classmethod
-    def validate_database_url(
-        cls,
-        database_url: str,
-    ) -> str:
-        """
-        Validate the database_url paramater.
-
-        Args:
-            database_url (str): the database_url paramater
-        Returns:
-            The validated database_url paramater.
-        Raises:
-            AttributeError if the database_url parameter is not a bool
-        """
-        if not isinstance(database_url, str):
-            raise AttributeError(
-                f"database_url must be of type str not {type(database_url)}"
-            )
-        return database_url
-
-    @field_validator("local")
-    @classmethod
-    def validate_local(
-        cls,
-        local: bool,
-    ) -> bool:
-        """
-        Validate the local paramater.
-
-        Args:
-            local (bool): the local paramater
-        Returns:
-            The validated local paramater.
-        Raises:
-            AttributeError if the local parameter is not a bool
-        """
-        if not isinstance(local, bool):
-            raise AttributeError(f"local must be of type str not {type(local)}")
-        return local
-
     @field_validator("default_log_level", mode="before")
     @classmethod
     def validate_log_level(
@@ -158,3 +53,18 @@ class Settings(BaseSettings):
             else:
                 default_log_level = int(getattr(logging, default_log_level.upper()))
         return default_log_level
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the process-wide settings.
+
+    The `.env` file is parsed and the validators are run only once per process;
+    use `Settings.model_copy` for per-run overrides rather than mutating the
+    returned instance.
+
+    Returns:
+        The cached Settings instance.
+    """
+    return Settings()
@@ -4,7 +4,7 @@ import logging
 from threading import local
 from typing import Any, Dict, MutableMapping, Optional, Tuple
 
-from src.common.env import Settings
+from src.common.env import get_settings
 
 
 _THREAD_LOCAL_VARS = local()
@@ -84,7 +84,7 @@ def get_logger(name: str, level: Optional[int] = None) -> ContextAwareLogAdapter
     """
     if level is None:
         if _LOG_LEVEL is None:
-            settings = Settings()
+            settings = get_settings()
             level = settings.default_log_level
         else:
             level = _LOG_LEVEL
@@ -1,15 +1,29 @@
 """Split lists into a subset of tasks."""
 
-from typing import Any, List
+from itertools import islice
+from typing import Any, Iterable, Iterator, List
 
 
-def split_list(target: List[Any], amount: int = 6) -> List[List[Any]]:
-    """Take an arbitrary list and split into a set of lists.
+def split_list(target: Iterable[Any], amount: int = 6) -> Iterator[List[Any]]:
+    """Lazily split an arbitrary iterable into a set of lists.
 
     Args:
-        target (List[Any]): the target list to split
+        target (Iterable[Any]): the target iterable to split
+        amount (int): the amount for each list to contain
+    Returns:
+        Iterator[List[Any]]
+    """
+    it = iter(target)
+    return iter(lambda: list(islice(it, amount)), [])
+
+
+def split_list_eager(target: Iterable[Any], amount: int = 6) -> List[List[Any]]:
+    """Take an arbitrary iterable and split into a list of lists.
+
+    Args:
+        target (Iterable[Any]): the target iterable to split
         amount (int): the amount for each list to contain
     Returns:
         List[List[Any]]
     """
-    return [target[x : x + amount] for x in range(0, len(target), amount)]
+    return list(split_list(target, amount=amount))
@@ -1,9 +1,9 @@
 """The watchlist flow."""
 
-from prefect import flow, get_run_logger
+from prefect import flow, get_run_logger, unmapped
 from pydantic import BaseModel
 
-from src.common.env import Settings
+from src.common.env import get_settings
 from src.pipeline.common import generate_flow_run_name
 from src.pipeline.tasks.recommender import (
     instantiate_recommender,
@@ -25,6 +25,8 @@ class RecommenderParameters(BaseModel):
     movie_file: str
     local: bool = True
     root: str = "./outputs"
+    index_type: str = "flat"
+    ivf_nprobe: int = 10
 
 
 class WatchlistParameters(BaseModel):
@@ -48,25 +50,28 @@ def letterboxd_watchlist(
     """
     logger = get_run_logger()
     logger.info("starting the watchlist scraping")
-    settings = Settings()
-    settings.username = settings.validate_username(watchlist_parameters.username)
-    settings.local = settings.validate_local(watchlist_parameters.local)
+    settings = get_settings().model_copy(
+        update={
+            "username": watchlist_parameters.username,
+            "local": watchlist_parameters.local,
+        }
+    )
     logger.info(f"using settings: {settings}")
 
     logger.info("creating the scraper")
     scraper = instantiate_letterboxd(settings)
 
-    logger.info("gathering the pages")
-    pages = gather_pages(scraper)
-    logger.info(f"found pages: {pages}")
+    # close the scraper even if scraping fails so its threads and pooled
+    # connections are released
+    with scraper:
+        logger.info("gathering the pages")
+        pages = gather_pages(scraper)
+        logger.info(f"found pages: {pages}")
 
-    logger.info("parsing the pages")
-    scraped_movies = []
-    for page in pages:
-        logger.info(f"scraping page: {page} ...")
-        movies = watchlist_scrape(scraper=scraper, page=page)
-        logger.info(f"page: {page} scraped")
-        scraped_movies.extend(movies)
+        logger.info("parsing the pages")
+        futures = watchlist_scrape.map(scraper=unmapped(scraper), page=pages)
+        scraped_movies = [movie for future in futures for movie in future.result()]
+        logger.info(f"scraped {len(scraped_movies)} movies from {len(pages)} pages")
 
     logger.info("combining into a dataframe")
     frame = combine_into_dataframe(movies=scraped_movies)
@@ -86,13 +91,23 @@ def letterboxd_watchlist(
     trainer = instantiate_recommender(
         movie_file=recommender_parameters.movie_file,
         extra_data=extra_data,
+        index_type=recommender_parameters.index_type,
+        ivf_nprobe=recommender_parameters.ivf_nprobe,
     )
 
-    logger.info("training the recommender")
-    trainer = train_recommender(trainer=trainer)
-
-    logger.info("saving the recommender")
-    save_recommender(trainer, recommender_parameters.root)
+    logger.info("training and saving the recommender")
+    trained = train_recommender.submit(
+        trainer=trainer, folder=recommender_parameters.root
+    )
+    saved = save_recommender.submit(
+        trainer=trainer,
+        folder=recommender_parameters.root,
+        wait_for=[trained],
+        return_state=False,
+    )
+    # result() raises if training failed and the save never ran, so the flow is
+    # marked failed instead of completing without a saved model
+    saved.result()
 
 
 if __name__ == "__main__":
@@ -15,33 +15,47 @@ from src.recommender.trainer import Trainer
 def instantiate_recommender(
     movie_file: str,
     extra_data: Optional[pd.DataFrame] = None,
+    index_type: str = "flat",
+    ivf_nprobe: int = 10,
 ) -> Trainer:
     """Instantiate the trainer.
 
     Args:
         movie_file (str): input data
+        extra_data (Optional[pd.DataFrame]): extra movies to train on
+        index_type (str): the faiss index to build, flat, hnsw or ivfpq
+        ivf_nprobe (int): the number of lists an ivfpq index searches
     Returns:
         Trainer
     """
     logger = get_run_logger()
     logger.info("instantiating the trainer")
 
-    return Trainer(movie_file=movie_file, extra_data=extra_data)
+    return Trainer(
+        movie_file=movie_file,
+        extra_data=extra_data,
+        index_type=index_type,
+        ivf_nprobe=ivf_nprobe,
+    )
 
 
 @task(cache_policy=NO_CACHE)
-def train_recommender(trainer: Trainer) -> Trainer:
+def train_recommender(trainer: Trainer, folder: Optional[str] = None) -> Trainer:
     """Train the recommendation engine.
 
     Args:
         trainer (Trainer): the instantiated trainer object
+        folder (Optional[str]): if set, stream the embeddings into this folder
     Returns:
         Trainer
     """
     logger = get_run_logger()
     logger.info("fitting the trainer")
 
-    trainer.fit()
+    output_dir = None
+    if folder is not None:
+        output_dir = os.path.join(folder, "recommender")
+    trainer.fit(output_dir=output_dir)
     return trainer
 
 
@@ -59,10 +73,7 @@ def save_recommender(trainer: Trainer, folder: str) -> None:
     logger.info("saving the trainer")
 
     subfolder = "recommender"
-    try:
-        logger.info(f"creating output directory: {folder}/{subfolder}")
-        os.makedirs(os.path.join(folder, subfolder))
-    except FileExistsError:
-        logger.warning(f"output_path: {folder}/{subfolder} already exists")
+    logger.info(f"creating output directory: {folder}/{subfolder}")
+    os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
 
     trainer.save(os.path.join(folder, subfolder))
@@ -1,6 +1,7 @@
 """Watchlist flow tasks."""
 
-from dataclasses import asdict
+from dataclasses import fields
+from operator import attrgetter
 from typing import List, Optional
 
 import pandas as pd
@@ -12,6 +13,9 @@ from src.common.env import Settings
 from src.scraper.letterboxd import LetterboxdScraper, Movie
 from src.scraper.recommender_data import enrich_movies
 
+MOVIE_COLUMNS = [field.name for field in fields(Movie)]
+_movie_getter = attrgetter(*MOVIE_COLUMNS)
+
 
 @task(cache_policy=NO_CACHE)
 def instantiate_letterboxd(settings: Settings) -> LetterboxdScraper:
@@ -72,7 +76,8 @@ def combine_into_dataframe(movies: List[Movie]) -> pd.DataFrame:
     logger = get_run_logger()
     logger.info("creating the dataframe")
 
-    return pd.DataFrame([asdict(x) for x in movies])
+    rows = list(map(_movie_getter, movies))
+    return pd.DataFrame(rows, columns=MOVIE_COLUMNS)
 
 
 @task(cache_policy=NO_CACHE)
@@ -89,7 +94,7 @@ def enrich_data_tmdb(scraper: LetterboxdScraper) -> None:
     scraper.enrich_movies()
 
 
-@task
+@task(cache_policy=NO_CACHE)
 def save_dataframe(
     scraper: LetterboxdScraper, root: Optional[str] = None
 ) -> pd.DataFrame:
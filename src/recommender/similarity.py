@@ -1,27 +1,79 @@
 """Semantic similarity model."""
 
-import json
 import logging
 import os
-from typing import Any, List, Optional, Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# bump whenever the persisted faiss index layout changes so stale indices
+# are regenerated instead of silently loaded
+INDEX_VERSION = 3
+
+FAISS_ADD_BATCH_SIZE = 65536
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+IVFPQ_NLIST = 100
+IVFPQ_M = 16
+IVFPQ_NBITS = 8
+# faiss k-means wants ~39 training points per centroid, and both the coarse
+# quantizer (nlist centroids) and each PQ sub-quantizer (2**nbits) are trained
+IVFPQ_MIN_TRAIN_POINTS = 39 * max(IVFPQ_NLIST, 2**IVFPQ_NBITS)
+
+
+@lru_cache(maxsize=4)
+def _load_sentence_transformer(
+    name: str, device: str, max_seq_length: int
+) -> "SentenceTransformer":
+    # torch and sentence_transformers are slow to import, so defer them until
+    # a model is actually needed
+    from sentence_transformers import SentenceTransformer
+
+    # loading the checkpoint is expensive, so share models across instances
+    model = SentenceTransformer(name, device=device)
+    model.max_seq_length = max_seq_length
+    if device == "cuda":
+        # FP16 inference roughly doubles encoder throughput on modern GPUs
+        model.half()
+    return model
+
+
+def _default_device() -> str:
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
 
 
 class SimilarityMeasure:
     def __init__(
         self,
         embed_model_name: str = "all-MiniLM-L6-v2",
-        embed_device: str = "cpu",
+        embed_device: Optional[str] = None,
         embed_batch_size: int = 64,
         embed_max_seq_length: int = 512,
+        index_type: str = "flat",
+        ivf_nprobe: int = 10,
     ) -> None:
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index_type '{index_type}', expected one of {INDEX_TYPES}."
+            )
+
         self.embed_model_name = embed_model_name
-        self.embed_device = embed_device
+        self.embed_device = embed_device or _default_device()
         self.embed_batch_size = embed_batch_size
         self.embed_max_seq_length = embed_max_seq_length
+        self.index_type = index_type
+        self.ivf_nprobe = ivf_nprobe
 
         self.embeddings = None
         self.faiss_index = None
@@ -29,30 +81,48 @@ class SimilarityMeasure:
         self.texts = None
         self.projections = None
 
-        self.embed_model = SentenceTransformer(
-            self.embed_model_name, device=self.embed_device
+        self.embed_model = _load_sentence_transformer(
+            self.embed_model_name, self.embed_device, self.embed_max_seq_length
         )
-        self.embed_model.max_seq_length = self.embed_max_seq_length
 
         self.index_to_id = None
 
     def fit(
-        self, texts: List[str], ids: List[int], embeddings: Optional[Any] = None
+        self,
+        texts: List[str],
+        ids: List[int],
+        embeddings: Optional[Any] = None,
+        embeddings_file: Optional[str] = None,
     ) -> Tuple[List[Any], List[int]]:
+        # check before embedding so a corpus too small for IVF-PQ fails fast
+        if self.index_type == "ivfpq" and len(texts) < IVFPQ_MIN_TRAIN_POINTS:
+            raise ValueError(
+                f"index_type 'ivfpq' needs at least {IVFPQ_MIN_TRAIN_POINTS} "
+                f"texts to train, got {len(texts)}; use 'flat' or 'hnsw' instead."
+            )
+
         self.texts = texts  # type: ignore
 
         if embeddings is None:
             logging.info("embedding texts...")
-            self.embeddings = self.embed(texts)  # type: ignore
+            # stream into a staging file so a failed fit never clobbers the
+            # embeddings of a previously saved model; save() moves it into place
+            staging_file = None
+            if embeddings_file is not None:
+                staging_file = f"{embeddings_file}.tmp"
+            self.embeddings = self.embed(texts, out_file=staging_file)  # type: ignore
         else:
             logging.info("using precomputed embeddings...")
             self.embeddings = embeddings
 
         logging.info("building faiss index...")
         self.faiss_index = self.build_faiss_index(self.embeddings)  # type: ignore
-        self.index_to_id = dict(
-            zip(list(range(self.faiss_index.ntotal)), ids)  # type: ignore
-        )
+        if not isinstance(self.embeddings, np.memmap):
+            # the index keeps its own FP32 copy, so hold and persist FP16 embeddings
+            self.embeddings = np.asarray(  # type: ignore
+                self.embeddings, dtype=np.float16
+            )
+        self.index_to_id = np.asarray(ids, dtype=np.int64)  # type: ignore
         return self.embeddings  # type: ignore
 
     def infer(self, texts: List[str], top_k: int = 1) -> Tuple[List[int], List[Any]]:
@@ -61,7 +131,10 @@ class SimilarityMeasure:
 
         return neighbours, embeddings
 
-    def embed(self, texts: List[str]) -> List[Any]:
+    def embed(self, texts: List[str], out_file: Optional[str] = None) -> List[Any]:
+        if out_file is not None:
+            return self._embed_to_file(texts, out_file)
+
         embeddings = self.embed_model.encode(
             texts,
             batch_size=self.embed_batch_size,
@@ -72,31 +145,116 @@ class SimilarityMeasure:
 
         return embeddings  # type: ignore
 
+    def _embed_to_file(self, texts: List[str], out_file: str) -> List[Any]:
+        # stream batches straight into an on-disk .npy so only one batch of
+        # embeddings is ever held in memory
+        folder = os.path.dirname(out_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        n = len(texts)
+        d = self.embed_model.get_sentence_embedding_dimension()
+        out = np.lib.format.open_memmap(
+            out_file, mode="w+", dtype=np.float16, shape=(n, d)
+        )
+        for i in range(0, n, self.embed_batch_size):
+            out[i : i + self.embed_batch_size] = self.embed_model.encode(
+                texts[i : i + self.embed_batch_size],
+                batch_size=self.embed_batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+        out.flush()
+
+        return out  # type: ignore
+
     def build_faiss_index(self, embeddings: List[Any]) -> List[int]:
-        index = faiss.IndexFlatL2(embeddings.shape[1])  # type: ignore
-        index.add(embeddings)
+        # embeddings are unit-normalized, so inner product ranks like L2
+        d = embeddings.shape[1]  # type: ignore
+        if self.index_type == "flat":
+            index = faiss.IndexFlatIP(d)
+        elif self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(d, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+        elif self.index_type == "ivfpq":
+            quantizer = faiss.IndexFlatIP(d)
+            index = faiss.IndexIVFPQ(
+                quantizer,
+                d,
+                IVFPQ_NLIST,
+                IVFPQ_M,
+                IVFPQ_NBITS,
+                faiss.METRIC_INNER_PRODUCT,
+            )
+            # the default of probing a single list searches 1% of the corpus
+            index.nprobe = self.ivf_nprobe
+            # only the IVF-PQ training step needs the full matrix in memory
+            index.train(np.ascontiguousarray(embeddings, dtype=np.float32))
+        else:
+            raise ValueError(f"Unknown index_type '{self.index_type}'.")
+        # faiss only accepts FP32 while the embeddings may be an FP16 memmap, so
+        # upcast and add one batch at a time to keep a single FP32 copy in RAM
+        for i in range(0, len(embeddings), FAISS_ADD_BATCH_SIZE):
+            index.add(
+                np.ascontiguousarray(
+                    embeddings[i : i + FAISS_ADD_BATCH_SIZE], dtype=np.float32
+                )
+            )
         return index  # type: ignore
 
+    def _backed_by(self, path: str) -> bool:
+        return (
+            isinstance(self.embeddings, np.memmap)
+            and os.path.exists(path)
+            and os.path.samefile(self.embeddings.filename, path)  # type: ignore
+        )
+
     def save(self, folder: str) -> None:
-        if not os.path.exists(folder):
-            os.makedirs(folder)
+        os.makedirs(folder, exist_ok=True)
 
-        with open(f"{folder}/embeddings.npy", "wb") as f:
-            np.save(f, self.embeddings)  # type: ignore
+        # drop the version first so a partially written model fails to load
+        # instead of pairing new files with stale ones
+        if os.path.exists(f"{folder}/version"):
+            os.remove(f"{folder}/version")
 
-        with open(f"{folder}/index_to_id.json", "w") as f:
-            json.dump(self.index_to_id, f)
+        embeddings_file = f"{folder}/embeddings.npy"
+        staging_file = f"{embeddings_file}.tmp"
+        if self._backed_by(staging_file):
+            # the embeddings were streamed into the staging file during fit
+            self.embeddings.flush()  # type: ignore
+            os.replace(staging_file, embeddings_file)
+            self.embeddings = np.load(embeddings_file, mmap_mode="r")
+        elif not self._backed_by(embeddings_file):
+            with open(embeddings_file, "wb") as f:
+                np.save(f, self.embeddings)  # type: ignore
+
+        with open(f"{folder}/index_to_id.npy", "wb") as f:
+            np.save(f, self.index_to_id)  # type: ignore
 
         faiss.write_index(self.faiss_index, f"{folder}/faiss.index")
 
+        with open(f"{folder}/version", "w") as f:
+            f.write(str(INDEX_VERSION))
+
     def load(self, folder: str) -> None:
         if not os.path.exists(folder):
             raise ValueError(f"The folder '{folder}' does not exsit.")
 
+        version = None
+        if os.path.exists(f"{folder}/version"):
+            with open(f"{folder}/version", "r") as f:
+                version = int(f.read().strip())
+        if version != INDEX_VERSION:
+            raise ValueError(
+                f"The index in '{folder}' has version {version}, expected "
+                f"{INDEX_VERSION}; please retrain the recommender."
+            )
+
         with open(f"{folder}/embeddings.npy", "rb") as f:
             self.embeddings = np.load(f)
 
-        with open(f"{folder}/index_to_id.json", "r") as f:
-            self.index_to_id = json.load(f)
+        with open(f"{folder}/index_to_id.npy", "rb") as f:
+            self.index_to_id = np.load(f)
 
         self.faiss_index = faiss.read_index(f"{folder}/faiss.index")
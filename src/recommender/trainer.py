@@ -1,10 +1,10 @@
 """Training runner."""
 
-from ast import literal_eval
+import os
+import re
 from typing import List, Optional
 
 import pandas as pd
-import torch
 
 from src.recommender.similarity import SimilarityMeasure
 
@@ -29,6 +29,8 @@ GENRES = [
     "Documentary",
     "Western",
 ]
+GENRES_SET = frozenset(GENRES)
+GENRE_NAME_PATTERN = re.compile(r"'name':\s*'([^']+)'")
 
 
 class Trainer(object):
@@ -38,40 +40,55 @@ class Trainer(object):
         self,
         movie_file: str,
         extra_data: Optional[pd.DataFrame] = None,
+        index_type: str = "flat",
+        ivf_nprobe: int = 10,
     ) -> None:
         """Instantiate the class."""
+        # torch is slow to import, so only pull it in once a trainer is built
+        import torch
+
         torch.set_num_threads(1)
         self.movie_file = movie_file
-        self.sim_model = SimilarityMeasure()
+        self.sim_model = SimilarityMeasure(index_type=index_type, ivf_nprobe=ivf_nprobe)
         self.extra_data = extra_data
         self.train_data = self.load_data(self.extra_data)
 
     def load_data(self, extra_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """Load the data."""
 
-        movies = pd.read_csv(self.movie_file)
-        movies = movies[["id", "original_title", "overview", "genres"]]
+        movies = pd.read_csv(
+            self.movie_file,
+            usecols=["id", "original_title", "overview", "genres"],
+            # Arrow-backed strings keep the columns in contiguous buffers, which
+            # makes the str.cat below a vectorized join instead of a loop over
+            # Python objects
+            dtype={
+                "id": "string[pyarrow]",
+                "original_title": "string[pyarrow]",
+                "overview": "string[pyarrow]",
+                "genres": "string[pyarrow]",
+            },
+        )
         movies = movies.rename(columns={"id": "movie_id", "original_title": "title"})
 
         movies["movie_id"] = pd.to_numeric(movies["movie_id"], errors="coerce")
 
-        def cleaner(x: list, genres: list = GENRES) -> list:
-            ret = []
-            for y in x:
-                if y in genres:
-                    ret.append(y)
-            return ret
-
-        movies["genres"] = movies["genres"].apply(
-            lambda x: [y["name"] for y in literal_eval(x)]
+        # many movies share the exact same genres string, so parse and join
+        # each distinct value once and map the result back onto the rows
+        parsed = {
+            raw: " ".join(
+                genre
+                for genre in GENRE_NAME_PATTERN.findall(raw)
+                if genre in GENRES_SET
+            )
+            for raw in movies["genres"].dropna().unique()
+        }
+        genres = pd.array(
+            [parsed.get(raw, "") for raw in movies["genres"]],
+            dtype="string[pyarrow]",
         )
-        movies["genres"] = movies["genres"].apply(cleaner)
-        movies["text"] = (
-            movies["title"]
-            + " "
-            + movies["overview"]
-            + " "
-            + movies["genres"].apply(lambda x: " ".join(x))
+        movies["text"] = movies["title"].str.cat(
+            [movies["overview"], pd.Series(genres, index=movies.index)], sep=" "
         )
 
         movies = movies.reset_index(drop=True)
@@ -86,19 +103,24 @@ class Trainer(object):
             extra_data["movie_id"] = extra_data["movie_id"].astype(int)
             extra_data = extra_data.dropna()
             extra_data = extra_data[
-                ~extra_data["movie_id"].isin(train_data["movie_id"].values.tolist())
+                ~extra_data["movie_id"].isin(train_data["movie_id"].to_numpy())
             ]
-            train_data = pd.concat([extra_data, train_data])
-            train_data = train_data.reset_index(drop=True)
+            train_data = pd.concat([extra_data, train_data], ignore_index=True)
 
-        train_data = train_data.dropna()
         return train_data
 
-    def fit(self) -> None:
-        """Fit the similarity model."""
+    def fit(self, output_dir: Optional[str] = None) -> None:
+        """Fit the similarity model.
+
+        If output_dir is given, the embeddings are streamed to disk there.
+        """
+        embeddings_file = None
+        if output_dir is not None:
+            embeddings_file = os.path.join(output_dir, "embeddings.npy")
         self.sim_model.fit(
-            self.train_data["text"].values,
+            self.train_data["text"].tolist(),
             ids=self.train_data["movie_id"].values.tolist(),
+            embeddings_file=embeddings_file,
         )
 
     def predict(self, movie_text: str, top_k: int = 5) -> List[str]:
@@ -1,30 +1,52 @@
 """Letterboxd scraper."""
 
-import json
+import errno
 import os
+import re
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Optional, no_type_check
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import requests
-from bs4 import BeautifulSoup
-from ratelimit import limits
-from selenium import webdriver
-from selenium.webdriver.firefox.webdriver import WebDriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from sqlalchemy import create_engine
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from requests.adapters import HTTPAdapter
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.sql import text as sa_text
+from urllib3.util.retry import Retry
 
 from src.common.env import Settings
 from src.common.logger import get_logger, LoggingContext
+from src.scraper.tmdb import TMDB_BASE_URL, fetch_movies
 
 
 logger = get_logger(__name__)
 
+FILM_FETCH_WORKERS = 8
+
+# errors os.link raises when the filesystem cannot hardlink the file
+HARDLINK_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+}
+
+# only build the parts of the pages that are read, not the whole DOM; strainers
+# compare the raw class attribute, so match the class as a whitespace-separated
+# token to keep elements that carry more than one class
+PAGINATION_STRAINER = SoupStrainer(
+    "li", class_=re.compile(r"(?:^|\s)paginate-page(?:\s|$)")
+)
+POSTER_STRAINER = SoupStrainer("li", class_=re.compile(r"(?:^|\s)griditem(?:\s|$)"))
+TMDB_ID_PATTERN = re.compile(rb'<body[^>]*data-tmdb-id="(\d+)"')
+
 
 @dataclass
 class Movie:
@@ -54,7 +76,7 @@ class LetterboxdScraper(object):
 
         Raises:
         """
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = TMDB_BASE_URL
         self.logger = logger
         self.settings = settings
         self.watchlist_url = (
@@ -65,24 +87,51 @@ class LetterboxdScraper(object):
             self.logger.info("getting the watchlist URL")
         self.movies: Optional[pd.DataFrame] = None
         self.enriched: Optional[pd.DataFrame] = None
+        self.session = self.__create_session()
+        # shared by every page so FILM_FETCH_WORKERS caps the film page requests
+        # even when the pages themselves are scraped concurrently
+        self.executor = ThreadPoolExecutor(max_workers=FILM_FETCH_WORKERS)
 
-    def __create_driver(self) -> WebDriver:
-        """Create the selenium webdriver.
+    def __create_session(self) -> requests.Session:
+        """Create the HTTP session used for the Letterboxd pages.
 
         Returns:
-            An instantiated webdriver
+            A requests session that backs off on rate limiting
         """
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
+        retries = Retry(total=5, status_forcelist=[429, 503], backoff_factor=1)
+        # block on a free pooled connection instead of opening and discarding
+        # extra ones when more requests are in flight than the pool holds
+        adapter = HTTPAdapter(
+            max_retries=retries, pool_maxsize=FILM_FETCH_WORKERS, pool_block=True
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Release the worker threads and pooled connections of the scraper."""
+        self.executor.shutdown()
+        self.session.close()
 
-        with LoggingContext({"options": options}):
-            self.logger.info("creating the headless driver")
+    def __enter__(self) -> "LetterboxdScraper":
+        """Enter into the context block."""
+        return self
 
-        driver = webdriver.Firefox(options=options)  # type: ignore[call-arg]  # noqa: E501
-        return driver
+    def __exit__(self, *exc: object) -> None:
+        """Exit the context block, closing the scraper."""
+        self.close()
+
+    def __get_html(self, url: str) -> str:
+        """Fetch the server-rendered HTML of a Letterboxd page.
+
+        Args:
+            url (str): the page to fetch
+        Returns:
+            The page HTML
+        """
+        response = self.session.get(url, timeout=30)
+        response.raise_for_status()
+        return response.text
 
     def get_watchlist_pages(self) -> List[int]:
         """Get the number of pages to paginate through.
@@ -91,20 +140,11 @@ class LetterboxdScraper(object):
             List[int] of the pages to scrape
         """
         self.logger.info("gathering the number of watchlist pages ...")
-        driver = self.__create_driver()
-        driver.get(self.watchlist_url)
-
-        try:
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.ID, "content-nav"))
-            )
-        except Exception as e:
-            self.logger.error(f"could not find content-nav: {e}")
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = BeautifulSoup(
+            self.__get_html(self.watchlist_url), "lxml", parse_only=PAGINATION_STRAINER
+        )
         pages = soup.find_all("li", class_="paginate-page")
-        last_page = int(pages[-1].text)
-        driver.quit()
+        last_page = int(pages[-1].text) if pages else 1
 
         self.logger.info(f"found {pages} to scrape through")
         return list(range(1, last_page + 1))
@@ -119,47 +159,51 @@ class LetterboxdScraper(object):
         with LoggingContext({"page": page}):
             self.logger.info(f"parsing watchlist page {page}")
 
-        driver = self.__create_driver()
-        driver.get(f"{self.watchlist_url}/page/{page}/")
-        time.sleep(0.5)
+        html = self.__get_html(f"{self.watchlist_url}/page/{page}/")
 
         self.logger.info("parsing the page ...")
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = BeautifulSoup(html, "lxml", parse_only=POSTER_STRAINER)
 
         self.logger.info("parsing the poster containers")
         films = soup.find_all("li", class_="griditem")
 
         self.logger.info(f"found {len(films)} ... parsing ... ")
-        driver.quit()
 
-        film_driver = self.__create_driver()
-        movies = []
-        for film in films:
-            try:
-                self.logger.info(
-                    f"gathering the TMDB info for {film.div.attrs["data-target-link"]}"
-                )
-                film_driver.get(
-                    f"https://letterboxd.com/{film.div.attrs["data-target-link"]}/"
-                )
-                time.sleep(0.5)
+        parsed = self.executor.map(self.__parse_film, films)
+        return [movie for movie in parsed if movie is not None]
 
-                soup = BeautifulSoup(film_driver.page_source, "html.parser")
-                tmdb_id = int(soup.find("body")["data-tmdb-id"])
+    @no_type_check
+    def __parse_film(self, film: Tag) -> Optional[Movie]:
+        """Parse a watchlist entry, fetching its TMDB id from the film page.
 
-                movie = Movie(
-                    name=film.div.attrs["data-item-name"],
-                    letterboxd_id=int(film.div.attrs["data-film-id"]),
-                    url=film.div.attrs["data-target-link"],
-                    tmdb_id=tmdb_id,
-                )
-                movies.append(movie)
-            except Exception as e:
-                self.logger.error(f"could not parse film due to: {e}")
-        film_driver.quit()
-        return movies
+        Args:
+            film (Tag): the watchlist grid item
+        Returns:
+            The extracted Movie, None if the film could not be parsed
+        """
+        try:
+            link = film.div.attrs["data-target-link"]
+            self.logger.info(f"gathering the TMDB info for {link}")
+            response = self.session.get(f"https://letterboxd.com/{link}/", timeout=30)
+            response.raise_for_status()
+
+            # only the body attribute is needed, so skip building a DOM and
+            # avoid decoding the page
+            match = TMDB_ID_PATTERN.search(response.content)
+            if match is None:
+                raise ValueError(f"no data-tmdb-id found for {link}")
+            tmdb_id = int(match.group(1))
+
+            return Movie(
+                name=film.div.attrs["data-item-name"],
+                letterboxd_id=int(film.div.attrs["data-film-id"]),
+                url=link,
+                tmdb_id=tmdb_id,
+            )
+        except Exception as e:
+            self.logger.error(f"could not parse film due to: {e}")
+            return None
 
-    @limits(calls=40, period=2)
     def enrich_movies(self) -> None:
         """Enrich the data from letterboxd with data from TMDB.
 
@@ -175,31 +219,36 @@ class LetterboxdScraper(object):
                 "self.movies has not been set -- please run self.scrape_watchlist() first"  # noqa: E501
             )
 
-        extra_data = []
-        tmdb_ids = self.movies["tmdb_id"]
-        for tmdb_id in tmdb_ids:
+        # one row per id, otherwise duplicated watchlist entries would multiply
+        # in the merge below
+        tmdb_ids = list(
+            dict.fromkeys(self.movies["tmdb_id"].astype("int64").to_numpy().tolist())
+        )
+        responses = fetch_movies(tmdb_ids, self.settings.tmdb_access_token)
+        found_ids, runtimes, poster_paths, vote_averages = [], [], [], []
+        for tmdb_id, resp in zip(tmdb_ids, responses):
+            if resp is None:
+                continue
             try:
-                temp = {}
-                headers = {
-                    "accept": "application/json",
-                    "Authorization": f"Bearer {self.settings.tmdb_access_token}",
-                }
-                response = requests.get(
-                    f"{self.base_url}/movie/{tmdb_id}?language=en-US", headers=headers
-                )
-                if response.status_code != 200:
-                    self.logger.error(f"request failed with {response.text}")
-                    continue
-                temp["tmdb_id"] = tmdb_id
-                resp = json.loads(response.text)
-                temp["runtime"] = resp["runtime"]
-                temp["poster_path"] = resp["poster_path"]
-                temp["vote_average"] = resp["vote_average"]
-                extra_data.append(temp)
+                runtime = resp["runtime"]
+                poster_path = resp["poster_path"]
+                vote_average = resp["vote_average"]
             except Exception as e:
                 self.logger.error(f"failed parsing {tmdb_id} - {e}")
-
-        extra_df = pd.DataFrame(extra_data)
+                continue
+            found_ids.append(tmdb_id)
+            runtimes.append(runtime)
+            poster_paths.append(poster_path)
+            vote_averages.append(vote_average)
+
+        extra_df = pd.DataFrame(
+            {
+                "tmdb_id": np.asarray(found_ids, dtype=np.int64),
+                "runtime": runtimes,
+                "poster_path": poster_paths,
+                "vote_average": vote_averages,
+            }
+        )
         self.enriched = self.movies.merge(extra_df, on="tmdb_id", how="inner")
 
     def save_to_db(self, root: Optional[str] = None) -> pd.DataFrame:
@@ -220,47 +269,65 @@ class LetterboxdScraper(object):
             if root is None:
                 root = "outputs"
             subdir = str(int(time.time()))
-            if os.path.exists(os.path.join(root, "current.csv")):
+            if os.path.exists(os.path.join(root, "current.parquet")):
                 self.logger.info("current database exists")
             else:
                 self.logger.info("current database does not exists")
-            updated = self.enriched.copy()
+            # tag the enriched frame in place rather than copying every column
+            self.enriched["username"] = self.settings.username
+            updated = self.enriched
+            self.logger.info(f"creating output directory: {root}/{subdir}")
+            os.makedirs(os.path.join(root, subdir), exist_ok=True)
+
+            history_path = os.path.join(root, subdir, "current.parquet")
+            current_path = os.path.join(root, "current.parquet")
+            # convert to arrow once and reuse the table for both file formats
+            table = pa.Table.from_pandas(updated, preserve_index=False)
+            self.logger.info(f"saving dataframe to: {history_path}")
+            pq.write_table(table, history_path, compression="snappy")
+            self.logger.info(f"linking {history_path} to: {current_path}")
+            # link under a temporary name and rename over the old file so
+            # readers never see a missing or half-written current.parquet
+            staging_path = f"{current_path}.tmp"
+            try:
+                os.remove(staging_path)
+            except FileNotFoundError:
+                pass
             try:
-                self.logger.info(f"creating output directory: {root}/{subdir}")
-                os.makedirs(os.path.join(root, subdir))
-            except FileExistsError:
-                self.logger.warning(f"output_path: {root}/{subdir} already exists")
-
-            updated["username"] = self.settings.username
-            self.logger.info(f"saving dataframe to: {root}/{subdir}/current.csv")
-            updated.to_csv(os.path.join(root, subdir, "current.csv"), index=False)
-            self.logger.info(f"saving dataframe to: {root}/current.csv")
-            updated.to_csv(os.path.join(root, "current.csv"), index=False)
+                os.link(history_path, staging_path)
+            except OSError as e:
+                if e.errno not in HARDLINK_UNSUPPORTED_ERRNOS:
+                    raise
+                self.logger.warning("hardlinks unsupported, copying instead")
+                shutil.copy(history_path, staging_path)
+            os.replace(staging_path, current_path)
+            self.logger.info(f"exporting dataframe to: {root}/current.csv")
+            pacsv.write_csv(table, os.path.join(root, "current.csv"))
         else:
             self.logger.info("creating the engine connection")
             engine = create_engine(self.settings.database_url)
 
-            self.logger.info("querying the database")
-            with engine.connect() as conn:
-                old_frame = pd.read_sql(
-                    f"SELECT * FROM movies WHERE username = '{self.settings.username}'",
-                    con=conn,
-                )
+            # tag the enriched frame in place rather than copying every column
+            self.enriched["username"] = self.settings.username
+            updated = self.enriched
 
-            if len(old_frame) != 0:
-                self.logger.info("dropping the data from the old table")
-                with engine.connect() as conn:
+            # replace the user's rows in a single transaction
+            with engine.begin() as conn:
+                if inspect(conn).has_table("movies"):
+                    self.logger.info("dropping the data from the old table")
                     conn.execute(
-                        sa_text(
-                            f"DELETE FROM movies WHERE username = {self.settings.username};"  # noqa: E501
-                        )
+                        sa_text("DELETE FROM movies WHERE username = :username"),
+                        {"username": self.settings.username},
                     )
-                    conn.commit()
 
-            updated = self.enriched.copy()
-            updated["username"] = self.settings.username
-            self.logger.info("saving the new dataframe to the database")
-            with engine.connect() as conn:
-                updated.to_sql("movies", con=conn, if_exists="append", index=False)
+                self.logger.info("saving the new dataframe to the database")
+                updated.to_sql(
+                    "movies",
+                    con=conn,
+                    if_exists="append",
+                    index=False,
+                    method="multi",
+                    chunksize=1000,
+                )
 
         return updated
@@ -1,20 +1,15 @@
 """Gathering extra data from TMDB API."""
 
-import json
-
+import numpy as np
 import pandas as pd
-import requests
-from ratelimit import limits
 
 from src.common.env import Settings
 from src.common.logger import get_logger
+from src.scraper.tmdb import fetch_movies
 
 logger = get_logger(__name__)
 
-BASE_URL = "https://api.themoviedb.org/3"
-
 
-@limits(calls=40, period=2)
 def enrich_movies(
     watchlist_dataframe: pd.DataFrame, settings: Settings
 ) -> pd.DataFrame:
@@ -27,30 +22,29 @@ def enrich_movies(
     Raises:
         RuntimeError if self.movies is not set
     """
-    extra_data = []
-    tmdb_ids = watchlist_dataframe["tmdb_id"]
-    for tmdb_id in tmdb_ids:
+    # one row per id so repeated watchlist entries are not trained on twice
+    tmdb_ids = list(
+        dict.fromkeys(
+            watchlist_dataframe["tmdb_id"].astype("int64").to_numpy().tolist()
+        )
+    )
+    responses = fetch_movies(tmdb_ids, settings.tmdb_access_token)
+    movie_ids, texts = [], []
+    for tmdb_id, resp in zip(tmdb_ids, responses):
+        if resp is None:
+            continue
         try:
-            temp = {}
-            headers = {
-                "accept": "application/json",
-                "Authorization": f"Bearer {settings.tmdb_access_token}",
-            }
-            response = requests.get(
-                f"{BASE_URL}/movie/{tmdb_id}?language=en-US", headers=headers
-            )
-            if response.status_code != 200:
-                logger.error(f"request failed with {response.text}")
-                continue
-            temp["movie_id"] = tmdb_id
-            resp = json.loads(response.text)
             genres = resp["genres"]
             genres = [x["name"] for x in genres]
             original_title = resp["original_title"]
             overview = resp["overview"]
-            temp["text"] = original_title + " " + overview + " " + " ".join(genres)
-            extra_data.append(temp)
+            text = original_title + " " + overview + " " + " ".join(genres)
         except Exception as e:
             logger.error(f"failed parsing {tmdb_id} - {e}")
+            continue
+        movie_ids.append(tmdb_id)
+        texts.append(text)
 
-    return pd.DataFrame(extra_data)
+    return pd.DataFrame(
+        {"movie_id": np.asarray(movie_ids, dtype=np.int64), "text": texts}
+    )
@@ -0,0 +1,144 @@
+"""Concurrent client for the TMDB movie details API."""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import httpx
+import orjson
+
+from src.common.logger import get_logger
+from src.scraper.tmdb_cache import (
+    TMDB_CACHE_DIR,
+    read_cached_movie,
+    write_cached_movie,
+)
+
+logger = get_logger(__name__)
+
+TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_CONCURRENCY = 16
+TMDB_RATE_LIMIT_CALLS = 40
+TMDB_RATE_LIMIT_PERIOD = 2
+TMDB_MAX_CONNECTIONS = 32
+TMDB_TIMEOUT = 5
+
+
+class _RateLimiter(object):
+    """Space out requests so at most `calls` start within any `period` seconds."""
+
+    def __init__(self, calls: int, period: float) -> None:
+        """Initialize the limiter."""
+        self.interval = period / calls
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Wait until the next request is allowed to start."""
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+
+async def _fetch_movie(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    limiter: _RateLimiter,
+    tmdb_id: int,
+    cache_dir: str = TMDB_CACHE_DIR,
+) -> Optional[Dict[str, Any]]:
+    """Fetch the TMDB details for a single movie.
+
+    Args:
+        client (httpx.AsyncClient): the shared HTTP client
+        semaphore (asyncio.Semaphore): bounds the concurrent requests
+        limiter (_RateLimiter): keeps the requests within the TMDB rate limit
+        tmdb_id (int): the TMDB id to fetch
+        cache_dir (str): the directory of the on-disk response cache
+    Returns:
+        The TMDB response, None if the request failed
+    """
+    try:
+        details = read_cached_movie(tmdb_id, folder=cache_dir)
+        if details is not None:
+            return details
+
+        async with semaphore:
+            await limiter.wait()
+            response = await client.get(
+                f"{TMDB_BASE_URL}/movie/{tmdb_id}?language=en-US"
+            )
+        if response.status_code != 200:
+            logger.error(f"request failed with {response.text}")
+            return None
+        fetched: Dict[str, Any] = orjson.loads(response.content)
+        write_cached_movie(tmdb_id, fetched, folder=cache_dir)
+        return fetched
+    except Exception as e:
+        logger.error(f"failed fetching {tmdb_id} - {e}")
+        return None
+
+
+async def _fetch_movies(
+    tmdb_ids: List[int],
+    access_token: str,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    cache_dir: str = TMDB_CACHE_DIR,
+) -> List[Optional[Dict[str, Any]]]:
+    """Fetch the TMDB details for all the movies concurrently."""
+    semaphore = asyncio.Semaphore(TMDB_CONCURRENCY)
+    limiter = _RateLimiter(TMDB_RATE_LIMIT_CALLS, TMDB_RATE_LIMIT_PERIOD)
+    headers = {
+        "accept": "application/json",
+        "Authorization": f"Bearer {access_token}",
+    }
+    if transport is None:
+        # a single HTTP/2 connection multiplexes the requests instead of paying
+        # a TCP + TLS handshake per movie
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=3,
+            limits=httpx.Limits(max_connections=TMDB_MAX_CONNECTIONS),
+        )
+    async with httpx.AsyncClient(
+        headers=headers, transport=transport, timeout=TMDB_TIMEOUT
+    ) as client:
+        return await asyncio.gather(
+            *[
+                _fetch_movie(client, semaphore, limiter, i, cache_dir=cache_dir)
+                for i in tmdb_ids
+            ]
+        )
+
+
+def fetch_movies(
+    tmdb_ids: List[int],
+    access_token: str,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    cache_dir: str = TMDB_CACHE_DIR,
+) -> List[Optional[Dict[str, Any]]]:
+    """Fetch the TMDB details for a set of movies.
+
+    Each distinct id is resolved once. Cached responses are served from disk;
+    the rest are requested concurrently while staying within the TMDB rate
+    limit.
+
+    Args:
+        tmdb_ids (List[int]): the TMDB ids to fetch
+        access_token (str): the TMDB access token
+        transport (Optional[httpx.AsyncBaseTransport]): the transport to send the
+            requests over, defaults to a pooled HTTP/2 transport
+        cache_dir (str): the directory of the on-disk response cache
+    Returns:
+        The TMDB responses in the order of tmdb_ids, None for failed requests
+    """
+    unique_ids = list(dict.fromkeys(tmdb_ids))
+    responses = asyncio.run(
+        _fetch_movies(
+            unique_ids, access_token, transport=transport, cache_dir=cache_dir
+        )
+    )
+    details = dict(zip(unique_ids, responses))
+    return [details[tmdb_id] for tmdb_id in tmdb_ids]
@@ -0,0 +1,51 @@
+"""On-disk cache of TMDB movie details."""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+
+TMDB_CACHE_DIR = os.path.join("outputs", "tmdb_cache")
+TMDB_CACHE_EXPIRY = 30 * 24 * 60 * 60
+
+
+def read_cached_movie(
+    tmdb_id: int, folder: str = TMDB_CACHE_DIR, expiry: int = TMDB_CACHE_EXPIRY
+) -> Optional[Dict[str, Any]]:
+    """Read the cached TMDB details of a movie.
+
+    Args:
+        tmdb_id (int): the TMDB id of the movie
+        folder (str): the cache directory
+        expiry (int): seconds after which a cached entry is considered stale
+    Returns:
+        The cached details, None if missing, stale or unreadable
+    """
+    path = os.path.join(folder, f"{tmdb_id}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > expiry:
+            return None
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())  # type: ignore
+    except (OSError, ValueError):
+        return None
+
+
+def write_cached_movie(
+    tmdb_id: int, details: Dict[str, Any], folder: str = TMDB_CACHE_DIR
+) -> None:
+    """Write the TMDB details of a movie to the cache.
+
+    Args:
+        tmdb_id (int): the TMDB id of the movie
+        details (Dict[str, Any]): the TMDB response to cache
+        folder (str): the cache directory
+    Returns:
+        None
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{tmdb_id}.json")
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(orjson.dumps(details))
+    os.replace(f"{path}.tmp", path)
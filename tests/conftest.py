@@ -0,0 +1,10 @@
+"""Shared test configuration."""
+
+import os
+
+# the settings are read when the loggers are created at import time, so give
+# the required values placeholders before any test module imports src
+os.environ.setdefault("USERNAME", "test")
+os.environ.setdefault("TMDB_ACCESS_TOKEN", "test")
+os.environ.setdefault("TMDB_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
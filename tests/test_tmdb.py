@@ -0,0 +1,154 @@
+"""Tests for the TMDB client and its on-disk cache."""
+
+import asyncio
+import os
+import time
+
+import httpx
+
+from src.scraper import tmdb
+from src.scraper.tmdb_cache import (
+    TMDB_CACHE_EXPIRY,
+    read_cached_movie,
+    write_cached_movie,
+)
+
+
+def movie_id(request):
+    return int(request.url.path.rsplit("/", 1)[-1])
+
+
+def test_fetch_movies_keeps_the_requested_order(tmp_path):
+    async def handler(request):
+        tmdb_id = movie_id(request)
+        # answer the later ids first so completion order differs from input order
+        await asyncio.sleep(0.01 * (5 - tmdb_id))
+        return httpx.Response(200, json={"id": tmdb_id})
+
+    details = tmdb.fetch_movies(
+        [1, 2, 3, 4],
+        "token",
+        transport=httpx.MockTransport(handler),
+        cache_dir=str(tmp_path),
+    )
+
+    assert [movie["id"] for movie in details] == [1, 2, 3, 4]
+
+
+def test_fetch_movies_sends_the_access_token(tmp_path):
+    headers = []
+
+    def handler(request):
+        headers.append(request.headers["Authorization"])
+        return httpx.Response(200, json={"id": movie_id(request)})
+
+    tmdb.fetch_movies(
+        [1], "token", transport=httpx.MockTransport(handler), cache_dir=str(tmp_path)
+    )
+
+    assert headers == ["Bearer token"]
+
+
+def test_fetch_movies_requests_duplicate_ids_once(tmp_path):
+    requested = []
+
+    def handler(request):
+        requested.append(movie_id(request))
+        return httpx.Response(200, json={"id": movie_id(request)})
+
+    details = tmdb.fetch_movies(
+        [3, 1, 3, 2, 1],
+        "token",
+        transport=httpx.MockTransport(handler),
+        cache_dir=str(tmp_path),
+    )
+
+    assert sorted(requested) == [1, 2, 3]
+    assert [movie["id"] for movie in details] == [3, 1, 3, 2, 1]
+
+
+def test_fetch_movies_returns_none_for_failed_ids(tmp_path):
+    def handler(request):
+        tmdb_id = movie_id(request)
+        if tmdb_id == 2:
+            return httpx.Response(404, json={"status_message": "not found"})
+        if tmdb_id == 3:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"id": tmdb_id})
+
+    details = tmdb.fetch_movies(
+        [1, 2, 3, 4],
+        "token",
+        transport=httpx.MockTransport(handler),
+        cache_dir=str(tmp_path),
+    )
+
+    assert details == [{"id": 1}, None, None, {"id": 4}]
+    # failures are not cached, so they are retried on the next run
+    assert sorted(os.listdir(tmp_path)) == ["1.json", "4.json"]
+
+
+def test_fetch_movies_serves_fresh_cache_entries(tmp_path):
+    write_cached_movie(1, {"id": 1, "title": "cached"}, folder=str(tmp_path))
+    requested = []
+
+    def handler(request):
+        requested.append(movie_id(request))
+        return httpx.Response(200, json={"id": movie_id(request)})
+
+    details = tmdb.fetch_movies(
+        [1, 2],
+        "token",
+        transport=httpx.MockTransport(handler),
+        cache_dir=str(tmp_path),
+    )
+
+    assert requested == [2]
+    assert details == [{"id": 1, "title": "cached"}, {"id": 2}]
+    assert read_cached_movie(2, folder=str(tmp_path)) == {"id": 2}
+
+
+def test_fetch_movies_refreshes_expired_cache_entries(tmp_path):
+    write_cached_movie(1, {"id": 1, "title": "stale"}, folder=str(tmp_path))
+    stale = time.time() - TMDB_CACHE_EXPIRY - 60
+    os.utime(tmp_path / "1.json", (stale, stale))
+
+    def handler(request):
+        return httpx.Response(200, json={"id": 1, "title": "fresh"})
+
+    details = tmdb.fetch_movies(
+        [1], "token", transport=httpx.MockTransport(handler), cache_dir=str(tmp_path)
+    )
+
+    assert details == [{"id": 1, "title": "fresh"}]
+    assert read_cached_movie(1, folder=str(tmp_path)) == {"id": 1, "title": "fresh"}
+
+
+def test_read_cached_movie_ignores_missing_and_corrupt_entries(tmp_path):
+    assert read_cached_movie(1, folder=str(tmp_path)) is None
+
+    (tmp_path / "2.json").write_bytes(b"{not json")
+    assert read_cached_movie(2, folder=str(tmp_path)) is None
+
+
+def test_fetch_movies_stays_within_the_rate_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(tmdb, "TMDB_RATE_LIMIT_CALLS", 4)
+    monkeypatch.setattr(tmdb, "TMDB_RATE_LIMIT_PERIOD", 0.2)
+    started = []
+
+    def handler(request):
+        started.append(time.monotonic())
+        return httpx.Response(200, json={"id": movie_id(request)})
+
+    tmdb.fetch_movies(
+        list(range(9)),
+        "token",
+        transport=httpx.MockTransport(handler),
+        cache_dir=str(tmp_path),
+    )
+
+    # the limiter hands out fixed slots, so a late start can shorten the gap to
+    # the next request, but no more than 4 ever start within a 0.2 s window
+    assert len(started) == 9
+    for earlier, later in zip(started, started[4:]):
+        assert later - earlier >= 0.2 - 0.03